@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+def measure_startup(timeout: float = 30.0) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, str(Path(__file__).parent / 'service.py')],
+                               cwd=Path(__file__).parent, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith('first frame sent'):
+                return time.perf_counter() - start
+            if time.perf_counter() - start > timeout:
+                break
+        raise RuntimeError('service did not send a frame')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = [measure_startup() for _ in range(runs)]
+    print(f'process start to first frame sent over {runs} runs: '
+          f'first {results[0]:.3f} s, min {min(results):.3f} s, median {statistics.median(results):.3f} s')
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import statistics
+import sys
+import threading
+import time
+
+from can_watchdog import InputWatchdog
+
+
+def measure_reaction(inputs: int = 100, timeout: float = 0.05) -> list:
+    expired_at = {}
+    done = threading.Event()
+
+    def on_expired(name: str):
+        expired_at[name] = time.monotonic()
+        if len(expired_at) == inputs:
+            done.set()
+
+    watchdog = InputWatchdog(on_expired, lambda name: None)
+    for i in range(inputs):
+        watchdog.add_input(f'input/{i}', timeout + i * 0.001)
+    watchdog.start()
+    for _ in range(10):
+        time.sleep(timeout / 2)
+        for i in range(inputs):
+            watchdog.feed(f'input/{i}')
+    done.wait(timeout + inputs * 0.001 + 5.0)
+    return [expired_at[name] - watchdog.deadlines[name] for name in expired_at]
+
+
+if __name__ == '__main__':
+    inputs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latencies = measure_reaction(inputs)
+    assert len(latencies) == inputs, 'not all inputs expired'
+    print(f'{inputs} inputs expired, reaction after deadline: median {statistics.median(latencies) * 1000:.3f} ms, '
+          f'max {max(latencies) * 1000:.3f} ms')
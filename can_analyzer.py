@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import can
+
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_INTERVAL_US = (1 << 32) - 1
+BUCKET_COUNT = (MAX_INTERVAL_US.bit_length() - SUB_BUCKET_BITS) * SUB_BUCKETS + SUB_BUCKETS
+RATE_WINDOW = 10.0
+
+
+def bucket_index(value: int) -> int:
+    shift = max(0, value.bit_length() - SUB_BUCKET_BITS - 1)
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_value(index: int) -> int:
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS) << shift
+
+
+def frame_bits(message: can.Message) -> int:
+    data_bits = 8 * message.dlc
+    if message.is_extended_id:
+        return 67 + data_bits + (54 + data_bits - 1) // 4
+    return 47 + data_bits + (34 + data_bits - 1) // 4
+
+
+class CanAnalyzer:
+    def __init__(self, bitrate: int = 500000, window: float = 1.0):
+        self.bitrate = bitrate
+        self.window = window
+        self.expected_periods: Dict[int, float] = {}
+        self.lock = threading.Lock()
+        self.stats: Dict[int, Dict] = {}
+        self.load_start: Optional[float] = None
+        self.load_bits = 0
+        self.load = 0.0
+
+    def process_message(self, message: can.Message):
+        timestamp = message.timestamp
+        with self.lock:
+            self.count_bus_load(timestamp, frame_bits(message))
+            stats = self.stats.get(message.arbitration_id)
+            if stats is None:
+                self.stats[message.arbitration_id] = {
+                    'count': 1,
+                    'first': timestamp,
+                    'last': timestamp,
+                    'min': None,
+                    'max': None,
+                    'sum': 0.0,
+                    'missed': 0,
+                    'histogram': [0] * BUCKET_COUNT,
+                    'window_start': timestamp,
+                    'window_count': 0,
+                    'rate': 0.0,
+                }
+                return
+            interval = timestamp - stats['last']
+            stats['count'] += 1
+            stats['last'] = timestamp
+            stats['window_count'] += 1
+            if timestamp - stats['window_start'] >= self.rate_window(message.arbitration_id):
+                stats['rate'] = stats['window_count'] / (timestamp - stats['window_start'])
+                stats['window_start'] = timestamp
+                stats['window_count'] = 0
+            if interval < 0.0:
+                return
+            stats['sum'] += interval
+            if stats['min'] is None or interval < stats['min']:
+                stats['min'] = interval
+            if stats['max'] is None or interval > stats['max']:
+                stats['max'] = interval
+            stats['histogram'][bucket_index(min(int(interval * 1e6), MAX_INTERVAL_US))] += 1
+            period = self.expected_periods.get(message.arbitration_id)
+            if period is not None and interval > 1.5 * period:
+                stats['missed'] += max(1, round(interval / period) - 1)
+
+    def rate_window(self, can_id: int) -> float:
+        return max(RATE_WINDOW, self.expected_periods.get(can_id, 0.0))
+
+    def count_bus_load(self, timestamp: float, bits: int):
+        if self.load_start is None:
+            self.load_start = timestamp
+        elapsed = timestamp - self.load_start
+        if elapsed >= self.window:
+            self.load = 100.0 * self.load_bits / (self.bitrate * elapsed)
+            self.load_start = timestamp
+            self.load_bits = 0
+        self.load_bits += bits
+
+    @staticmethod
+    def percentile(histogram: List[int], total: int, fraction: float) -> Optional[float]:
+        if total == 0:
+            return None
+        target = fraction * total
+        seen = 0
+        for index, count in enumerate(histogram):
+            seen += count
+            if count > 0 and seen >= target:
+                return (bucket_value(index) + bucket_value(index + 1)) / 2e6
+        return None
+
+    def bus_load(self) -> float:
+        with self.lock:
+            if self.load_start is None or time.time() - self.load_start >= 2 * self.window:
+                return 0.0
+            return self.load
+
+    def snapshot(self) -> Dict[int, Dict]:
+        now = time.time()
+        with self.lock:
+            snapshot = {}
+            for can_id, stats in self.stats.items():
+                intervals = stats['count'] - 1
+                period = self.expected_periods.get(can_id)
+                rate = stats['rate']
+                silent = now - stats['last']
+                if silent > 1.5 * (period if period is not None else self.rate_window(can_id)):
+                    rate = min(rate, 1.0 / silent)
+                missed = stats['missed']
+                if period is not None and now - stats['last'] > 1.5 * period:
+                    missed += int((now - stats['last']) // period)
+                snapshot[can_id] = {
+                    'count': stats['count'],
+                    'rate': rate,
+                    'mean': stats['sum'] / intervals if intervals > 0 else None,
+                    'min': stats['min'],
+                    'max': stats['max'],
+                    'p50': self.percentile(stats['histogram'], intervals, 0.5),
+                    'p99': self.percentile(stats['histogram'], intervals, 0.99),
+                    'missed': missed,
+                    'expected': period,
+                }
+            return snapshot
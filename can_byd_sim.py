@@ -1,44 +1,76 @@
+import functools
 import sched
+import time
+from typing import Dict, List, Optional
 
 import can
 
 from can_service_events import CanServiceEvents
 from can_storage import CanStorage
 from can_thread import CanThread
+from can_transmit import CanTransmitQueue
+
+LIMITS_PERIOD = 1.9
+
+RESPONSES: List[Dict] = [
+    {
+        'can_id': 0x151,
+        'data': b'\x01',
+        'mask': b'\xff',
+        'response': [(0x250, b'\x03\x16\x00\x66\x00\x33\x02\x09', 0.0),
+                     (0x290, b'\x06\x37\x10\xd9\x00\x00\x00\x00', 0.0),
+                     (0x2d0, b'\x00' + b'BYD' + b'\x00' * 4, 0.0),
+                     (0x3d0, b'\x00' + b'Battery', 0.0),
+                     (0x3d0, b'\x01' + b'-Box Pr', 0.0),
+                     (0x3d0, b'\x02' + b'emium H', 0.0),
+                     (0x3d0, b'\x03' + b'VS' + b'\x00' * 5, 0.0)],
+    },
+]
 
 
 class CanBydSim:
-    def __init__(self, storage: CanStorage, can_bus: can.interface.Bus, service_mode: bool = False):
+    def __init__(self, storage: CanStorage, can_bus: can.interface.Bus, service_mode: bool = False,
+                 fast_start: bool = False):
         self.sto: CanStorage = storage
         self.can_bus: can.interface.Bus = can_bus
         self.scheduler: sched.scheduler = sched.scheduler()
         self.thread: CanThread = CanThread('byd-sim', self.run)
         self.events: CanServiceEvents = CanServiceEvents()
         self.service_mode: bool = service_mode
+        self.fast_start: bool = fast_start
+        self.responses: List[Dict] = RESPONSES
+        self.transmit: CanTransmitQueue = CanTransmitQueue(can_bus, self.message_sent)
+
+    def find_response(self, message: can.Message) -> Optional[Dict]:
+        for response in self.responses:
+            if self.sto.message_matches(message, response):
+                return response
+        return None
 
     def process_message(self, message: can.Message):
         if not self.service_mode:
             print(message)
             self.sto.process_message(message)
         self.events.on_received(message)
-        if message.arbitration_id == 0x151:
-            if message.data[0] == 0x1:
-                messages = [(0x250, b'\x03\x16\x00\x66\x00\x33\x02\x09'),
-                            (0x290, b'\x06\x37\x10\xd9\x00\x00\x00\x00'),
-                            (0x2d0, b'\x00' + b'BYD' + b'\x00' * 4),
-                            (0x3d0, b'\x00' + b'Battery'),
-                            (0x3d0, b'\x01' + b'-Box Pr'),
-                            (0x3d0, b'\x02' + b'emium H'),
-                            (0x3d0, b'\x03' + b'VS' + b'\x00' * 5)]
-                for message in messages:
-                    can_message = can.Message(arbitration_id=message[0], data=message[1], is_extended_id=False)
-                    if not self.service_mode:
-                        self.sto.process_message(can_message)
-                    try:
-                        self.can_bus.send(can_message)
-                        self.events.on_sent(can_message)
-                    except can.CanError as e:
-                        print(f'can write failed: {e}')
+        response = self.find_response(message)
+        if response is None:
+            return
+        requested = time.monotonic()
+        frames = response['response']
+        for i, (can_id, data, gap) in enumerate(frames):
+            can_message = can.Message(arbitration_id=can_id, data=data, is_extended_id=False)
+            on_done = None
+            if i == len(frames) - 1:
+                on_done = functools.partial(self.response_sent, message, requested)
+            self.transmit.put(can_message, gap, on_done)
+
+    def response_sent(self, request: can.Message, requested: float):
+        self.events.on_response(request, time.monotonic() - requested)
+
+    def message_sent(self, message: can.Message):
+        if not self.service_mode:
+            self.sto.process_message(message)
+        self.events.on_sent(message)
 
     def run(self):
         self.events.on_start()
@@ -46,19 +78,22 @@ class CanBydSim:
         if not self.service_mode:
             self.sto.load_message_infos()
         while self.thread.running:
-            self.scheduler.run(blocking=False)
+            next_event = self.scheduler.run(blocking=False)
+            next_transmit = self.transmit.flush()
+            timeout = min((delay for delay in (next_event, next_transmit) if delay is not None), default=None)
             try:
-                message = self.can_bus.recv(0.1)
+                message = self.thread.recv(self.can_bus, timeout)
             except can.CanError as e:
                 print(f'can read failed: {e}')
                 continue
             if message is not None:
                 self.process_message(message)
         list(map(self.scheduler.cancel, self.scheduler.queue))
+        self.transmit.clear()
         self.events.on_stop()
 
     def init_scheduler(self):
-        self.scheduler.enter(1.9, 1, self.send_limits)
+        self.scheduler.enter(0.0 if self.fast_start else LIMITS_PERIOD, 1, self.send_limits)
         self.scheduler.enter(9.9, 1, self.send_states)
         self.scheduler.enter(59.9, 1, self.send_alarm)
         self.scheduler.enter(9.9, 1, self.send_battery_info)
@@ -88,62 +123,39 @@ class CanBydSim:
                         if self.sto.overwrite and 'overwrite' in message_info:
                             new_bytes = self.calculate_bytes(message_info, message_info['overwrite'])
                             data[startbit:message_info['endbit']] = new_bytes
-        message = can.Message(arbitration_id=can_id, data=data, is_extended_id=False)
-        if not self.service_mode:
-            self.sto.process_message(message)
-        return message
+        return can.Message(arbitration_id=can_id, data=data, is_extended_id=False)
 
     def send_limits(self):
         message = self.calculate_message(0x110, b'\x09\x20\x06\x40\x01\x00\x01\x00')
-        try:
-            self.can_bus.send(message)
-            self.events.on_sent(message)
-        except can.CanError as e:
-            print(f'can write failed: {e}')
+        self.transmit.put(message, replace=True)
         if not self.service_mode:
             print(message)
-        self.scheduler.enter(1.9, 1, self.send_limits)
+        self.scheduler.enter(LIMITS_PERIOD, 1, self.send_limits)
 
     def send_states(self):
         message = self.calculate_message(0x150, b'\x26\x0c\x27\x10\x00\xf3\x00\xfa')
-        try:
-            self.can_bus.send(message)
-            self.events.on_sent(message)
-        except can.CanError as e:
-            print(f'can write failed: {e}')
+        self.transmit.put(message, replace=True)
         if not self.service_mode:
             print(message)
         self.scheduler.enter(9.9, 1, self.send_states)
 
     def send_alarm(self):
         message = self.calculate_message(0x190, b'\x00' * 3 + b'\x04' + b'\x00' * 4)
-        try:
-            self.can_bus.send(message)
-            self.events.on_sent(message)
-        except can.CanError as e:
-            print(f'can write failed: {e}')
+        self.transmit.put(message, replace=True)
         if not self.service_mode:
             print(message)
         self.scheduler.enter(59.9, 1, self.send_alarm)
 
     def send_battery_info(self):
         message = self.calculate_message(0x1d0, b'\x08\x49\x00\x00\x00\xb4\x03\x08')
-        try:
-            self.can_bus.send(message)
-            self.events.on_sent(message)
-        except can.CanError as e:
-            print(f'can write failed: {e}')
+        self.transmit.put(message, replace=True)
         if not self.service_mode:
             print(message)
         self.scheduler.enter(9.9, 1, self.send_battery_info)
 
     def send_cell_info(self):
         message = self.calculate_message(0x210, b'\x00\xbe\x00\xb4' + b'\x00' * 4)
-        try:
-            self.can_bus.send(message)
-            self.events.on_sent(message)
-        except can.CanError as e:
-            print(f'can write failed: {e}')
+        self.transmit.put(message, replace=True)
         if not self.service_mode:
             print(message)
         self.scheduler.enter(9.9, 1, self.send_cell_info)
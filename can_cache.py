@@ -0,0 +1,31 @@
+import hashlib
+import pickle
+from pathlib import Path
+from typing import Any, Callable
+
+CACHE_VERSION = 2
+CACHE_FOLDER = Path(__file__).parent / '.cache'
+
+
+def load_cached(filename: str, prefix: str, parse: Callable[[bytes], Any], cache_folder: Path = CACHE_FOLDER) -> Any:
+    content = Path(filename).read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    cache_file = cache_folder / f'{prefix}_{CACHE_VERSION}_{digest}.pickle'
+    if cache_file.is_file():
+        try:
+            with open(cache_file, 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f'cache read failed: {e}')
+    result = parse(content)
+    if result is None:
+        return result
+    try:
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_suffix('.tmp')
+        with open(temp_file, 'wb') as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_file.replace(cache_file)
+    except OSError as e:
+        print(f'cache write failed: {e}')
+    return result
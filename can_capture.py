@@ -0,0 +1,98 @@
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import can
+
+RECORD = struct.Struct('<dIBB8s')
+FLAG_EXTENDED_ID = 0x1
+
+
+def unpack_message(buffer: bytes, offset: int, channel: Optional[str]) -> can.Message:
+    timestamp, can_id, flags, dlc, data = RECORD.unpack_from(buffer, offset)
+    return can.Message(timestamp=timestamp, arbitration_id=can_id, is_extended_id=bool(flags & FLAG_EXTENDED_ID),
+                       dlc=dlc, data=data[:dlc], channel=channel)
+
+
+class CaptureRing:
+    def __init__(self, name: str, folder: Path, capacity: int = 100000, pre_seconds: float = 10.0,
+                 post_seconds: float = 10.0):
+        self.name = name
+        self.folder = folder
+        self.capacity = capacity
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.buffer = bytearray(RECORD.size * capacity)
+        self.index = 0
+        self.size = 0
+        self.channel = None
+        self.pending: Optional[str] = None
+        self.dump_queue: Optional[queue.SimpleQueue] = None
+        self.post_until = 0.0
+
+    def append(self, message: can.Message):
+        flags = FLAG_EXTENDED_ID if message.is_extended_id else 0
+        offset = self.index * RECORD.size
+        RECORD.pack_into(self.buffer, offset, message.timestamp, message.arbitration_id, flags, message.dlc,
+                         bytes(message.data))
+        self.index = (self.index + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        self.channel = message.channel
+        if self.dump_queue is not None:
+            self.dump_queue.put(bytes(self.buffer[offset:offset + RECORD.size]))
+
+    def trigger(self, reason: str):
+        self.pending = reason
+
+    def poll(self):
+        now = time.time()
+        if self.pending is not None:
+            reason, self.pending = self.pending, None
+            self.post_until = now + self.post_seconds
+            if self.dump_queue is None:
+                self.start_dump(now, reason)
+        if self.dump_queue is not None and now >= self.post_until:
+            self.close()
+
+    def next_deadline(self) -> Optional[float]:
+        if self.dump_queue is None:
+            return None
+        return max(0.0, self.post_until - time.time())
+
+    def close(self):
+        if self.dump_queue is not None:
+            self.dump_queue.put(None)
+            self.dump_queue = None
+
+    def start_dump(self, now: float, reason: str):
+        filename = self.folder / f'{self.name}_capture_{now:.0f}.txt'
+        print(f'{self.name} capture triggered by {reason}, writing {filename}')
+        self.dump_queue = queue.SimpleQueue()
+        threading.Thread(name=f'{self.name}-capture', target=self.write_dump, daemon=True,
+                         args=(filename, bytes(self.buffer), self.index, self.size, self.channel,
+                               now - self.pre_seconds, self.dump_queue)).start()
+
+    def write_dump(self, filename: Path, buffer: bytes, index: int, size: int, channel: Optional[str], since: float,
+                   dump_queue: queue.SimpleQueue):
+        start = (index - size) % self.capacity
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(buffer, (start + middle) % self.capacity * RECORD.size)[0] < since:
+                low = middle + 1
+            else:
+                high = middle
+        try:
+            with open(filename, 'w') as file:
+                for i in range(low, size):
+                    print(unpack_message(buffer, (start + i) % self.capacity * RECORD.size, channel), file=file)
+                record = dump_queue.get()
+                while record is not None:
+                    print(unpack_message(record, 0, channel), file=file)
+                    record = dump_queue.get()
+        except OSError as e:
+            print(f'capture write failed: {e}')
@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from can_storage import CanStorage
+
+KEEPALIVE = 15.0
+PAGE = b'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>can-service</title>
+<style>
+body { font-family: monospace; }
+td, th { padding: 0 .6em; text-align: right; }
+td.data, td.signals { text-align: left; }
+</style>
+</head>
+<body>
+<p>interval
+<select id="interval">
+<option>100</option><option>250</option><option selected>1000</option><option>5000</option>
+</select> ms, bus load <span id="load">-</span> %</p>
+<table>
+<thead><tr><th>ID</th><th>Time</th><th>Interval</th><th>Data</th><th class="signals">Signals</th></tr></thead>
+<tbody id="frames"></tbody>
+</table>
+<script>
+const rows = {};
+let source = null;
+function connect() {
+  if (source !== null) source.close();
+  source = new EventSource('events?interval=' + document.getElementById('interval').value);
+  source.onmessage = (event) => {
+    const delta = JSON.parse(event.data);
+    document.getElementById('load').textContent = delta.bus_load.toFixed(1);
+    for (const frame of delta.frames) {
+      let row = rows[frame.id];
+      if (row === undefined) {
+        row = rows[frame.id] = document.createElement('tr');
+        row.dataset.id = frame.id;
+        const body = document.getElementById('frames');
+        const next = Array.from(body.children).find((other) => other.dataset.id > frame.id);
+        body.insertBefore(row, next === undefined ? null : next);
+      }
+      const signals = Object.entries(frame.signals).map(([name, value]) => name + '=' + value).join(' ');
+      row.innerHTML = '<td>' + frame.id + '</td><td>' + new Date(frame.timestamp * 1000).toLocaleTimeString() +
+        '</td><td>' + (frame.interval * 1000).toFixed(1) + '</td><td class="data">' + frame.data +
+        '</td><td class="signals">' + signals + '</td>';
+    }
+  };
+}
+document.getElementById('interval').onchange = connect;
+connect();
+</script>
+</body>
+</html>
+'''
+
+
+class CanDashboard:
+    def __init__(self, storage: CanStorage, host: str = '0.0.0.0', port: int = 8080, tick: float = 0.1,
+                 on_trigger: Optional[Callable[[str], None]] = None):
+        self.storage = storage
+        self.on_trigger = on_trigger
+        self.tick = tick
+        self.condition = threading.Condition()
+        self.tick_count = 0
+        self.version = 0
+        self.frames: Dict[int, Tuple[int, str]] = {}
+        self.deltas: Dict[int, bytes] = {}
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.server_thread = threading.Thread(name='dashboard-server', target=self.server.serve_forever, daemon=True)
+        self.update_thread = threading.Thread(name='dashboard-update', target=self.update, daemon=True)
+
+    def start(self):
+        self.update_thread.start()
+        self.server_thread.start()
+        print(f'dashboard listening on port {self.server.server_address[1]}')
+
+    def encode_frame(self, can_id: int, message, interval: float) -> str:
+        signals = {}
+        message_infos = self.storage.message_infos.get(can_id, {})
+        for startbit, message_info in list(message_infos.items()):
+            value = int.from_bytes(message.data[startbit:message_info['endbit']], byteorder='big',
+                                   signed=message_info['signed'])
+            name = message_info.get('topic', f'{startbit}')
+            signals[name] = round(message_info['scaling'] * value, 3)
+        return json.dumps({
+            'id': f'{can_id:04x}',
+            'timestamp': message.timestamp,
+            'interval': interval,
+            'data': message.data.hex(' '),
+            'signals': signals,
+        }, separators=(',', ':'))
+
+    def update(self):
+        while True:
+            time.sleep(self.tick)
+            message_versions = self.storage.message_versions.copy()
+            latest_messages = self.storage.latest_messages.copy()
+            message_interval = self.storage.message_interval.copy()
+            frames = dict(self.frames)
+            version = self.version
+            for can_id, message_version in message_versions.items():
+                if can_id not in latest_messages:
+                    continue
+                if can_id not in frames or frames[can_id][0] != message_version:
+                    frames[can_id] = (message_version, self.encode_frame(can_id, latest_messages[can_id],
+                                                                         message_interval.get(can_id, -1.0)))
+                    version = max(version, message_version)
+            with self.condition:
+                self.frames = frames
+                self.version = version
+                self.deltas = {}
+                self.tick_count += 1
+                self.condition.notify_all()
+
+    def delta(self, since: int) -> Tuple[int, bytes]:
+        with self.condition:
+            version = self.version
+            delta = self.deltas.get(since)
+            if delta is None:
+                frames = ','.join(frame for can_id, (frame_version, frame) in sorted(self.frames.items())
+                                  if frame_version > since)
+                delta = (f'{{"version":{version},"bus_load":{self.storage.analyzer.bus_load():.2f},'
+                         f'"frames":[{frames}]}}').encode()
+                self.deltas[since] = delta
+            return version, delta
+
+    def wait_tick(self, tick_count: int, every: int) -> Optional[int]:
+        with self.condition:
+            target = (tick_count // every + 1) * every
+            if not self.condition.wait_for(lambda: self.tick_count >= target, timeout=10 * self.tick * every):
+                return None
+            return self.tick_count
+
+    def handler(self):
+        dashboard = self
+
+        class DashboardRequestHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/':
+                    self.send_content('text/html', PAGE)
+                elif url.path == '/snapshot':
+                    self.send_content('application/json', dashboard.delta(0)[1])
+                elif url.path == '/events':
+                    self.stream_events(parse_qs(url.query))
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if urlparse(self.path).path == '/trigger' and dashboard.on_trigger is not None:
+                    dashboard.on_trigger(f'http from {self.client_address[0]}')
+                    self.send_response(204)
+                    self.end_headers()
+                else:
+                    self.send_error(404)
+
+            def send_content(self, content_type: str, content: bytes):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def stream_events(self, query: Dict):
+                try:
+                    interval = float(query.get('interval', ['1000'])[0]) / 1000
+                except ValueError:
+                    interval = 1.0
+                every = max(1, round(interval / dashboard.tick))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                since = -1
+                tick_count = dashboard.tick_count
+                last_write = 0.0
+                try:
+                    while True:
+                        if dashboard.version != since:
+                            since, delta = dashboard.delta(max(since, 0))
+                            self.wfile.write(b'data: ' + delta + b'\n\n')
+                            self.wfile.flush()
+                            last_write = time.monotonic()
+                        elif time.monotonic() - last_write > KEEPALIVE:
+                            self.wfile.write(b':\n\n')
+                            self.wfile.flush()
+                            last_write = time.monotonic()
+                        tick_count = dashboard.wait_tick(tick_count, every)
+                        if tick_count is None:
+                            return
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+        return DashboardRequestHandler
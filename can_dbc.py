@@ -0,0 +1,134 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from can_cache import CACHE_FOLDER, load_cached
+
+MESSAGE_PATTERN = re.compile(r'^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)')
+SIGNAL_PATTERN = re.compile(r'^SG_\s+(\w+)\s*(?:(M|m\d+M?)\s*)?:\s*(\d+)\|(\d+)@([01])([+-])\s*'
+                            r'\(([^,]+),([^)]+)\)\s*\[([^|]*)\|([^\]]*)\]\s*"([^"]*)"')
+COMMENT_PATTERN = re.compile(r'^CM_\s+SG_\s+(\d+)\s+(\w+)\s+"([^"]*)"', re.MULTILINE)
+EXTENDED_ID_FLAG = 0x80000000
+
+
+def parse_dbc(text: str) -> Dict[int, Dict]:
+    messages = {}
+    message = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('BO_ '):
+            match = MESSAGE_PATTERN.match(line)
+            if match is None:
+                message = None
+                continue
+            can_id = int(match.group(1))
+            message = {
+                'name': match.group(2),
+                'dlc': int(match.group(3)),
+                'sender': match.group(4),
+                'is_extended_id': bool(can_id & EXTENDED_ID_FLAG),
+                'signals': [],
+            }
+            messages[can_id] = message
+        elif line.startswith('SG_ ') and message is not None:
+            match = SIGNAL_PATTERN.match(line)
+            if match is None:
+                print(f'dbc signal not understood: {line}')
+                continue
+            message['signals'].append({
+                'name': match.group(1),
+                'multiplexer': match.group(2),
+                'start': int(match.group(3)),
+                'length': int(match.group(4)),
+                'big_endian': match.group(5) == '0',
+                'signed': match.group(6) == '-',
+                'scaling': float(match.group(7)),
+                'offset': float(match.group(8)),
+                'minimum': float(match.group(9) or 0),
+                'maximum': float(match.group(10) or 0),
+                'unit': match.group(11),
+                'comment': '',
+            })
+        elif not line:
+            message = None
+    for match in COMMENT_PATTERN.finditer(text):
+        for signal in messages.get(int(match.group(1)), {}).get('signals', []):
+            if signal['name'] == match.group(2):
+                signal['comment'] = match.group(3)
+    return messages
+
+
+def load_dbc(filename: str, cache_folder: Path = CACHE_FOLDER) -> Dict[int, Dict]:
+    return load_cached(filename, 'dbc', lambda content: parse_dbc(content.decode('latin-1')), cache_folder)
+
+
+def signal_startbyte(signal: Dict) -> Optional[int]:
+    if signal['length'] % 8 != 0 or signal['offset'] != 0.0:
+        return None
+    if signal['big_endian'] and signal['start'] % 8 == 7:
+        return signal['start'] // 8
+    if not signal['big_endian'] and signal['length'] == 8 and signal['start'] % 8 == 0:
+        return signal['start'] // 8
+    return None
+
+
+def signal_skip_reason(signal: Dict) -> str:
+    if signal['multiplexer'] is not None:
+        return 'multiplexed'
+    if signal['offset'] != 0.0:
+        return 'with offset'
+    if signal['length'] % 8 != 0:
+        return 'not whole bytes'
+    if not signal['big_endian'] and signal['length'] > 8:
+        return 'little endian'
+    return 'not byte aligned'
+
+
+def dbc_signals(messages: Dict[int, Dict]):
+    skipped: Dict[str, int] = {}
+    for can_id, message in sorted(messages.items()):
+        if message['is_extended_id']:
+            skipped['extended id'] = skipped.get('extended id', 0) + len(message['signals'])
+            continue
+        for signal in message['signals']:
+            startbit = None if signal['multiplexer'] is not None else signal_startbyte(signal)
+            if startbit is None:
+                reason = signal_skip_reason(signal)
+                skipped[reason] = skipped.get(reason, 0) + 1
+                continue
+            yield can_id, startbit, message, signal
+    if len(skipped) > 0:
+        print('dbc signals skipped: ' + ', '.join(f'{count} {reason}' for reason, count in sorted(skipped.items())))
+
+
+def dbc_to_message_infos(messages: Dict[int, Dict], node: Optional[str] = None) -> Dict[int, Dict[int, Dict]]:
+    message_infos = {}
+    for can_id, startbit, message, signal in dbc_signals(messages):
+        length = signal['length'] // 8
+        message_info = {
+            'endbit': startbit + length,
+            'length': length,
+            'scaling': signal['scaling'],
+            'signed': signal['signed'],
+            'topic': f"{message['name']}/{signal['name']}".lower(),
+        }
+        if node is not None and message['sender'] != node:
+            message_info['read_only'] = True
+        message_infos.setdefault(can_id, {})[startbit] = message_info
+    return message_infos
+
+
+def dbc_to_display_messages(messages: Dict[int, Dict]) -> List[Dict[str, str]]:
+    display_messages = []
+    for can_id, startbit, message, signal in dbc_signals(messages):
+        display_messages.append({
+            'can_id_hex': f'{can_id:04x}',
+            'description': signal['comment'] or f"{message['name']} {signal['name']} {signal['unit']}".strip(),
+            'endbit': str(startbit + signal['length'] // 8),
+            'overwrite': '',
+            'scaling': f"{signal['scaling']:g}",
+            'signed': str(int(signal['signed'])),
+            'source': 'dbc',
+            'startbit': str(startbit),
+        })
+    return display_messages
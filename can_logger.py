@@ -1,7 +1,11 @@
 import can
 import time
 from pathlib import Path
+from typing import Dict, List
 
+import yaml
+
+from can_capture import CaptureRing
 from can_storage import CanStorage
 from can_thread import CanThread
 
@@ -13,21 +17,73 @@ class CanLogger:
         self.can1 = can1
         self.can0_to_can1 = CanThread('can0_to_can1', self.log_0_to_1)
         self.can1_to_can0 = CanThread('can1_to_can0', self.log_1_to_0)
+        self.folder = Path('/mnt/ssd/logs')
+        self.log_all = False
+        self.triggers: List[Dict] = []
+        capture = self.load_capture_config()
+        self.captures: Dict[str, CaptureRing] = {
+            name: CaptureRing(name, self.folder, capture.get('capacity', 100000), capture.get('pre_seconds', 10.0),
+                              capture.get('post_seconds', 10.0))
+            for name in (self.can0_to_can1.name, self.can1_to_can0.name)
+        }
+
+    def load_capture_config(self) -> Dict:
+        if not Path('capture.yaml').is_file():
+            return {}
+        with open('capture.yaml', 'r') as file:
+            capture = yaml.safe_load(file) or {}
+        self.log_all = capture.get('log_all', False)
+        for trigger in capture.get('triggers', []):
+            if 'data' in trigger:
+                trigger['data'] = bytes.fromhex(trigger['data'])
+                trigger['mask'] = bytes.fromhex(trigger.get('mask', 'ff' * len(trigger['data'])))
+            self.triggers.append(trigger)
+        return capture
+
+    def trigger(self, reason: str = 'manual'):
+        for capture in self.captures.values():
+            capture.trigger(reason)
+        self.can0_to_can1.wakeup()
+        self.can1_to_can0.wakeup()
+
+    def check_triggers(self, message: can.Message):
+        for trigger in self.triggers:
+            if message.arbitration_id != trigger['can_id']:
+                continue
+            if 'data' in trigger:
+                matched = self.sto.message_matches(message, trigger)
+                reason = f'{message.arbitration_id:03x} {message.data.hex()}'
+            else:
+                value = int.from_bytes(message.data[trigger['startbit']:trigger['endbit']], byteorder='big',
+                                       signed=trigger.get('signed', False))
+                value = trigger.get('scaling', 1.0) * value
+                matched = ('above' in trigger and value > trigger['above']
+                           or 'below' in trigger and value < trigger['below'])
+                reason = f"{trigger.get('description', f'{message.arbitration_id:03x}')} = {value:.2f}"
+            if matched and not trigger.get('matched', False):
+                self.trigger(reason)
+            trigger['matched'] = matched
 
     def start(self, can_read: can.interface.Bus, can_write: can.interface.Bus, can_thread: CanThread, file_prefix: str):
-        folder = Path('/mnt/ssd/logs')
-        logfile = folder / f'{file_prefix}_{time.time():.0f}.txt'
-        with open(logfile, 'w') as file:
+        capture = self.captures[file_prefix]
+        file = None
+        if self.log_all:
+            file = open(self.folder / f'{file_prefix}_{time.time():.0f}.txt', 'w')
+        try:
             while can_thread.running:
+                capture.poll()
                 try:
-                    message = can_read.recv(0.1)
+                    message = can_thread.recv(can_read, capture.next_deadline())
                 except can.CanError as e:
                     print(f'can read failed: {e}')
                     continue
                 if message is not None:
                     print(message)
-                    print(message, file=file)
-                    file.flush()
+                    capture.append(message)
+                    if file is not None:
+                        print(message, file=file)
+                        file.flush()
+                    self.check_triggers(message)
                     if self.sto.overwrite:
                         overwritten = False
                         with self.sto.overwrite_messages_lock:
@@ -43,6 +99,10 @@ class CanLogger:
                     except can.CanError as e:
                         print(f'can write failed: {e}')
                     self.sto.process_message(message)
+        finally:
+            capture.close()
+            if file is not None:
+                file.close()
 
     def log_0_to_1(self):
         self.start(self.can0, self.can1, self.can0_to_can1, self.can0_to_can1.name)
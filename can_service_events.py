@@ -2,4 +2,4 @@ from events import Events
 
 
 class CanServiceEvents(Events):
-    __events__ = ('on_start', 'on_stop', 'on_received', 'on_sent',)
+    __events__ = ('on_start', 'on_stop', 'on_received', 'on_sent', 'on_response',)
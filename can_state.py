@@ -0,0 +1,114 @@
+import atexit
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+DELETED = '-'
+
+
+class OverwriteState:
+    def __init__(self, filename: str, compact_after: int = 1000):
+        self.path = Path(filename)
+        self.compact_after = compact_after
+        self.values: Dict[str, float] = {}
+        self._records = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file = None
+        self._thread = threading.Thread(name='overwrite-state', target=self._run, daemon=True)
+        atexit.register(self.close)
+
+    def load(self) -> Dict[str, float]:
+        self.values = {}
+        self._records = 0
+        if self.path.is_file():
+            with open(self.path, 'r') as file:
+                for line in file:
+                    if not line.endswith('\n'):
+                        break
+                    topic, _, value = line[:-1].partition('\t')
+                    if value == DELETED:
+                        self.values.pop(topic, None)
+                    else:
+                        try:
+                            self.values[topic] = float(value)
+                        except ValueError:
+                            print(f'state journal line ignored: {line!r}')
+                            continue
+                    self._records += 1
+        self._compact()
+        self._thread.start()
+        return dict(self.values)
+
+    def set(self, topic: str, value: float):
+        self._queue.put((topic, value))
+
+    def delete(self, topic: str):
+        self._queue.put((topic, None))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            while record is not None and self._records <= self.compact_after:
+                self._append(*record)
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    record = ()
+                    break
+            if record:
+                self._append(*record)
+            if self._file is not None:
+                try:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    print(f'state journal write failed: {e}')
+            if self._records > self.compact_after:
+                self._compact()
+            if record is None:
+                if self._file is not None:
+                    self._file.close()
+                return
+
+    def _append(self, topic: str, value: Optional[float]):
+        if value is None:
+            self.values.pop(topic, None)
+            line = f'{topic}\t{DELETED}\n'
+        else:
+            self.values[topic] = value
+            line = f'{topic}\t{value!r}\n'
+        if self._file is None:
+            return
+        try:
+            self._file.write(line)
+            self._records += 1
+        except OSError as e:
+            print(f'state journal write failed: {e}')
+
+    def _compact(self):
+        if self._file is not None:
+            self._file.close()
+        temp_path = self.path.with_suffix('.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'w') as file:
+                for topic, value in self.values.items():
+                    file.write(f'{topic}\t{value!r}\n')
+                file.flush()
+                os.fsync(file.fileno())
+            temp_path.replace(self.path)
+            self._records = len(self.values)
+        except OSError as e:
+            print(f'state journal compaction failed: {e}')
+        try:
+            self._file = open(self.path, 'a')
+        except OSError as e:
+            print(f'state journal open failed: {e}')
+            self._file = None
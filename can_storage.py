@@ -2,6 +2,10 @@ import can
 import json
 import threading
 from pathlib import Path
+from typing import Dict, List
+
+from can_analyzer import CanAnalyzer
+from can_dbc import dbc_to_display_messages, load_dbc
 
 
 class CanStorage:
@@ -9,11 +13,15 @@ class CanStorage:
         self.dict_lock = threading.Lock()
         self.latest_messages = {}
         self.message_interval = {}
+        self.message_versions = {}
+        self.version = 0
         self.overwrite = False
         self.overwrite_messages = []
         self.overwrite_messages_lock = threading.Lock()
         self.message_infos = {}
         self.message_infos_lock = threading.Lock()
+        self.dbc_file = 'display.dbc'
+        self.analyzer = CanAnalyzer()
 
     @staticmethod
     def log_line_to_message(line: str) -> can.Message:
@@ -32,6 +40,15 @@ class CanStorage:
         return can.Message(timestamp=float(timestamp), arbitration_id=can_id, data=line, is_extended_id=False,
                            channel=channel)
 
+    @staticmethod
+    def message_matches(message: can.Message, pattern: Dict) -> bool:
+        if message.arbitration_id != pattern['can_id'] or len(message.data) < len(pattern['mask']):
+            return False
+        for data, pattern_data, mask in zip(message.data, pattern['data'], pattern['mask']):
+            if data & mask != pattern_data & mask:
+                return False
+        return True
+
     def load_log(self, filename: str):
         with open(filename) as file:
             for line in file:
@@ -57,12 +74,27 @@ class CanStorage:
                 self.message_interval[message.arbitration_id] = message.timestamp - self.latest_messages[
                     message.arbitration_id].timestamp
             self.latest_messages[message.arbitration_id] = message
+            self.version += 1
+            self.message_versions[message.arbitration_id] = self.version
+        self.analyzer.process_message(message)
 
-    def load_overwrite_messages(self):
+    def read_display_messages(self) -> List[Dict[str, str]]:
+        display_messages = []
         if Path('display.json').is_file():
+            with open('display.json', 'r') as f:
+                display_messages = json.load(f)
+        if Path(self.dbc_file).is_file():
+            known = {(message['can_id_hex'].lower(), message['startbit']) for message in display_messages}
+            for message in dbc_to_display_messages(load_dbc(self.dbc_file)):
+                if (message['can_id_hex'], message['startbit']) not in known:
+                    display_messages.append(message)
+        return display_messages
+
+    def load_overwrite_messages(self):
+        display_messages = self.read_display_messages()
+        if len(display_messages) > 0:
             with self.overwrite_messages_lock:
-                with open('display.json', 'r') as f:
-                    self.overwrite_messages = json.load(f)
+                self.overwrite_messages = display_messages
                 self.overwrite_messages[:] = [message for message in self.overwrite_messages if
                                               len(message['overwrite']) > 0]
                 for i, overwrite_message in enumerate(self.overwrite_messages):
@@ -83,9 +115,8 @@ class CanStorage:
     def load_message_infos(self):
         with self.message_infos_lock:
             self.message_infos = {}
-            if Path('display.json').is_file():
-                with open('display.json', 'r') as f:
-                    message_infos = json.load(f)
+            message_infos = self.read_display_messages()
+            if len(message_infos) > 0:
                 for i, message_info in enumerate(message_infos):
                     can_id = bytes.fromhex(message_infos[i]['can_id_hex'])
                     can_id = int.from_bytes(can_id, byteorder='big', signed=False)
@@ -1,35 +1,94 @@
+import os
+import selectors
 import threading
-from typing import Callable
+from typing import Callable, Optional
+
+import can
 
 
 class CanThread:
     def __init__(self, name: str, target: Callable):
         self.name = name
-        self._alive = False
         self.running = False
         self._target = target
         self._thread = None
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._stopped.set()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector = None
+        self._selector_bus = None
 
     def start_thread(self):
-        if not self._alive:
+        with self._lock:
+            if self.is_alive():
+                if self.running or self._thread is threading.current_thread():
+                    return
+                self._thread.join()
+            self._drain_wakeup()
+            self.running = True
+            self._stopped.clear()
             self._thread = threading.Thread(name=self.name, target=self._run, daemon=True)
             self._thread.start()
 
     def stop_thread(self):
-        if self._alive:
-            self.running = False
+        with self._lock:
+            if self.is_alive():
+                self.running = False
+                self.wakeup()
 
     def start_stop_thread(self):
-        if self._alive:
-            self.stop_thread()
-        else:
-            self.start_thread()
+        with self._lock:
+            if self.running:
+                self.stop_thread()
+            else:
+                self.start_thread()
+
+    def wakeup(self):
+        try:
+            os.write(self._wakeup_write, b'\x00')
+        except BlockingIOError:
+            pass
+
+    def wait_stopped(self, timeout: Optional[float] = None) -> bool:
+        return self._stopped.wait(timeout)
+
+    def recv(self, bus: can.interface.Bus, timeout: Optional[float] = None) -> Optional[can.Message]:
+        if not self.running:
+            return None
+        try:
+            fileno = bus.fileno()
+        except NotImplementedError:
+            return bus.recv(0.1 if timeout is None else min(timeout, 0.1))
+        if self._selector_bus is not bus:
+            if self._selector is not None:
+                self._selector.close()
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+            self._selector.register(fileno, selectors.EVENT_READ)
+            self._selector_bus = bus
+        for key, _ in self._selector.select(timeout):
+            if key.fd == self._wakeup_read:
+                self._drain_wakeup()
+            else:
+                return bus.recv(0)
+        return None
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_read, 64):
+                pass
+        except BlockingIOError:
+            pass
 
     def _run(self):
-        self._alive = True
-        self.running = True
-        self._target()
-        self._alive = False
+        try:
+            self._target()
+        finally:
+            self.running = False
+            self._stopped.set()
 
     def is_alive(self):
-        return self._alive
+        return not self._stopped.is_set()
@@ -0,0 +1,69 @@
+import collections
+import errno
+import time
+from typing import Callable, Deque, List, Optional
+
+import can
+
+
+class CanTransmitQueue:
+    def __init__(self, can_bus: can.interface.Bus, on_sent: Callable[[can.Message], None],
+                 max_backoff: float = 0.1, max_retries: int = 5, max_length: int = 100):
+        self.can_bus = can_bus
+        self.on_sent = on_sent
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.max_length = max_length
+        self.queue: Deque[List] = collections.deque()
+        self.last_sent = 0.0
+        self.retry_at = 0.0
+        self.backoff = 0.0
+
+    def put(self, message: can.Message, gap: float = 0.0, on_done: Optional[Callable[[], None]] = None,
+            replace: bool = False):
+        if replace:
+            for item in self.queue:
+                if item[0].arbitration_id == message.arbitration_id:
+                    item[0] = message
+                    return
+        if len(self.queue) >= self.max_length:
+            print(f'transmit queue full, dropped {self.queue.popleft()[0]}')
+        self.queue.append([message, gap, on_done, 0])
+
+    def clear(self):
+        self.queue.clear()
+        self.backoff = 0.0
+
+    @staticmethod
+    def is_buffer_full(e: can.CanError) -> bool:
+        error_code = getattr(e, 'error_code', None)
+        return error_code == errno.ENOBUFS or error_code is None and isinstance(e, can.CanOperationError)
+
+    def flush(self) -> Optional[float]:
+        while len(self.queue) > 0:
+            item = self.queue[0]
+            message, gap, on_done, retries = item
+            now = time.monotonic()
+            send_at = max(self.last_sent + gap, self.retry_at)
+            if now < send_at:
+                return send_at - now
+            try:
+                self.can_bus.send(message)
+            except can.CanError as e:
+                self.backoff = min(max(self.backoff * 2, 0.001), self.max_backoff)
+                self.retry_at = now + self.backoff
+                item[3] = retries + 1
+                if not self.is_buffer_full(e) and item[3] > self.max_retries:
+                    print(f'can write failed: {e}')
+                    self.queue.popleft()
+                    self.backoff = 0.0
+                    continue
+                return self.backoff
+            self.queue.popleft()
+            self.backoff = 0.0
+            self.last_sent = now
+            message.timestamp = time.time()
+            self.on_sent(message)
+            if on_done is not None:
+                on_done()
+        return None
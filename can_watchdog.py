@@ -0,0 +1,62 @@
+import collections
+import heapq
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Tuple
+
+
+class InputWatchdog:
+    def __init__(self, on_expired: Callable[[str], None], on_recovered: Callable[[str], None]):
+        self.on_expired = on_expired
+        self.on_recovered = on_recovered
+        self.timeouts: Dict[str, float] = {}
+        self.deadlines: Dict[str, float] = {}
+        self.expired: Dict[str, bool] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._recovered: Deque[str] = collections.deque()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(name='input-watchdog', target=self._run, daemon=True)
+
+    def add_input(self, name: str, timeout: float):
+        with self._condition:
+            self.timeouts[name] = timeout
+            self.expired[name] = False
+            self._arm(name, time.monotonic())
+
+    def start(self):
+        if len(self.timeouts) > 0 and not self._thread.is_alive():
+            self._thread.start()
+
+    def feed(self, name: str):
+        if name not in self.timeouts:
+            return
+        with self._condition:
+            self._arm(name, time.monotonic())
+            if self.expired[name]:
+                self.expired[name] = False
+                self._recovered.append(name)
+                self._condition.notify()
+
+    def _arm(self, name: str, now: float):
+        deadline = now + self.timeouts[name]
+        self.deadlines[name] = deadline
+        heapq.heappush(self._heap, (deadline, name))
+        if self._heap[0] == (deadline, name):
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                while len(self._recovered) == 0 and (len(self._heap) == 0 or self._heap[0][0] > now):
+                    self._condition.wait(self._heap[0][0] - now if len(self._heap) > 0 else None)
+                    now = time.monotonic()
+                if len(self._recovered) > 0:
+                    callback, name = self.on_recovered, self._recovered.popleft()
+                else:
+                    deadline, name = heapq.heappop(self._heap)
+                    if self.deadlines[name] != deadline or self.expired[name]:
+                        continue
+                    self.expired[name] = True
+                    callback = self.on_expired
+            callback(name)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import sys
+import time
+
+import can
+
+from can_dashboard import CanDashboard
+from can_logger import CanLogger
+from can_storage import CanStorage
+
+
+def open_bus(channel: str) -> can.interface.Bus:
+    try:
+        return can.interface.Bus(channel=channel, interface='socketcan')
+    except OSError as e:
+        print(e)
+        return can.interface.Bus(channel=channel, interface='virtual')
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    storage = CanStorage()
+    storage.load_message_infos()
+    can_logger = CanLogger(storage, open_bus('can0'), open_bus('can1'))
+    can_logger.can0_to_can1.start_thread()
+    can_logger.can1_to_can0.start_thread()
+    CanDashboard(storage, port=port, on_trigger=can_logger.trigger).start()
+    while True:
+        time.sleep(3600)
@@ -6,7 +6,8 @@ import sys
 from pathlib import Path
 from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtCore import QTimer
-from PyQt5.QtWidgets import QTableWidgetItem, QDialog, QMainWindow
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QTableWidgetItem, QDialog, QMainWindow, QShortcut
 
 from can_byd_sim import CanBydSim
 from can_logger import CanLogger
@@ -33,6 +34,7 @@ class ValuesDialog(Ui_Dialog):
         self.tableWidgetDisplay.setHorizontalHeaderLabels(self.labels)
 
         self.display_messages = []
+        self.dbc_messages = {}
         self.load_config()
 
         timer = QTimer(self.dialog)
@@ -49,16 +51,18 @@ class ValuesDialog(Ui_Dialog):
         self.tableWidgetDisplay.removeRow(self.tableWidgetDisplay.currentRow())
 
     def load_config(self):
-        if Path('display.json').is_file():
-            with open('display.json', 'r') as f:
-                self.display_messages = json.load(f)
+        self.display_messages = self.storage.read_display_messages()
+        self.dbc_messages = {(display_message['can_id_hex'], display_message['startbit']): display_message
+                             for display_message in self.display_messages if display_message.get('source') == 'dbc'}
+        if len(self.display_messages) > 0:
             self.tableWidgetDisplay.clear()
             self.tableWidgetDisplay.setHorizontalHeaderLabels(self.labels)
             for i, display_message in enumerate(self.display_messages):
                 self.tableWidgetDisplay.insertRow(i)
 
-                self.tableWidgetDisplay.setItem(i, self.labels.index('ID Hex'),
-                                                QTableWidgetItem(display_message['can_id_hex']))
+                can_id_hex_item = QTableWidgetItem(display_message['can_id_hex'])
+                can_id_hex_item.setData(QtCore.Qt.UserRole, display_message.get('source', ''))
+                self.tableWidgetDisplay.setItem(i, self.labels.index('ID Hex'), can_id_hex_item)
                 self.tableWidgetDisplay.setItem(i, self.labels.index('Startbit'),
                                                 QTableWidgetItem(display_message['startbit']))
                 self.tableWidgetDisplay.setItem(i, self.labels.index('Endbit'),
@@ -77,8 +81,16 @@ class ValuesDialog(Ui_Dialog):
         self.dialog.close()
 
     def save_config(self):
+        display_messages = []
+        for display_message in self.display_messages:
+            if display_message.get('source') == 'dbc':
+                dbc_key = (display_message['can_id_hex'], display_message['startbit'])
+                if display_message == self.dbc_messages.get(dbc_key):
+                    continue
+                display_message = {key: value for key, value in display_message.items() if key != 'source'}
+            display_messages.append(display_message)
         with open('display.json', 'w') as f:
-            json.dump(self.display_messages, f, sort_keys=True)
+            json.dump(display_messages, f, sort_keys=True)
 
     def insert_row(self):
         self.tableWidgetDisplay.insertRow(self.tableWidgetDisplay.rowCount())
@@ -93,6 +105,8 @@ class ValuesDialog(Ui_Dialog):
                 continue
             can_id_hex = can_id_hex_item.text()
             display_message['can_id_hex'] = can_id_hex
+            if can_id_hex_item.data(QtCore.Qt.UserRole):
+                display_message['source'] = can_id_hex_item.data(QtCore.Qt.UserRole)
             try:
                 can_id = bytes.fromhex(can_id_hex)
             except ValueError:
@@ -195,9 +209,12 @@ class MainWindow(Ui_MainWindow):
         self.pushButtonValues.clicked.connect(self.display_values)
         self.pushButtonOverwrite.clicked.connect(self.storage.overwrite_toggle)
         self.pushButtonBydsim.clicked.connect(self.can_byd_sim.thread.start_stop_thread)
+        self.shortcutCapture = QShortcut(QKeySequence('Ctrl+T'), self.main_window)
+        self.shortcutCapture.activated.connect(self.can_logger.trigger)
 
         self.labels = ['Timestamp', 'Time', 'ID Hex', 'ID Dec', 'Data', '0U16', '0S16', '1U16', '1S16', '2U16', '2S16',
-                       '3U16', '3S16', '0U32', '0S32', '1U32', '1S32', 'Interval', 'Channel']
+                       '3U16', '3S16', '0U32', '0S32', '1U32', '1S32', 'Interval', 'Count', 'Rate', 'P99', 'Missed',
+                       'Channel']
         self.refresh_values()
         self.tableWidgetMessages.resizeColumnsToContents()
 
@@ -238,6 +255,8 @@ class MainWindow(Ui_MainWindow):
             self.pushButtonOverwrite.setText(self.pushButtonOverwrite.text().upper())
         else:
             self.pushButtonOverwrite.setText(self.pushButtonOverwrite.text().lower())
+        stats = self.storage.analyzer.snapshot()
+        self.statusbar.showMessage(f'bus load {self.storage.analyzer.bus_load():.1f} %')
         with self.storage.dict_lock:
             self.tableWidgetMessages.clear()
             self.tableWidgetMessages.setRowCount(len(self.storage.latest_messages))
@@ -289,10 +308,20 @@ class MainWindow(Ui_MainWindow):
                 self.tableWidgetMessages.setItem(i, self.labels.index('1S32'), QTableWidgetItem(str(value_2_s)))
 
                 if message.arbitration_id in self.storage.message_interval:
-                    interval = self.storage.message_interval[message.arbitration_id]
+                    interval = self.storage.message_interval[message.arbitration_id] * 1000
                 else:
                     interval = -1
-                self.tableWidgetMessages.setItem(i, self.labels.index('Interval'), QTableWidgetItem(f'{interval:.0f}'))
+                self.tableWidgetMessages.setItem(i, self.labels.index('Interval'), QTableWidgetItem(f'{interval:.1f}'))
+                if message.arbitration_id in stats:
+                    message_stats = stats[message.arbitration_id]
+                    p99 = -1 if message_stats['p99'] is None else message_stats['p99'] * 1000
+                    self.tableWidgetMessages.setItem(i, self.labels.index('Count'),
+                                                     QTableWidgetItem(str(message_stats['count'])))
+                    self.tableWidgetMessages.setItem(i, self.labels.index('Rate'),
+                                                     QTableWidgetItem(f"{message_stats['rate']:.2f}"))
+                    self.tableWidgetMessages.setItem(i, self.labels.index('P99'), QTableWidgetItem(f'{p99:.1f}'))
+                    self.tableWidgetMessages.setItem(i, self.labels.index('Missed'),
+                                                     QTableWidgetItem(str(message_stats['missed'])))
                 self.tableWidgetMessages.setItem(i, self.labels.index('Channel'),
                                                  QTableWidgetItem(f'{message.channel}'))
 
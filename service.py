@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
+import json
+import threading
+import time
+
+STARTUP_TIME = time.perf_counter()
+
 from pathlib import Path
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import can
-import paho.mqtt.client as mqtt
-import yaml
 
 from can_byd_sim import CanBydSim
+from can_cache import load_cached
+from can_dbc import dbc_to_message_infos, load_dbc
+from can_state import OverwriteState
 from can_storage import CanStorage
+from can_watchdog import InputWatchdog
+
+if TYPE_CHECKING:
+    import paho.mqtt.client as mqtt
 
 
 class CanService:
@@ -15,13 +26,13 @@ class CanService:
         config = self.get_config('config.yaml')
         self.total_system_voltage_topic = config.get('total_system_voltage_topic', 'esp-total/total_voltage')
         self.total_system_current_topic = config.get('total_system_current_topic', 'esp-total/total_current')
-        self.config = config['messages']
+        self.config = self.merge_dbc(config)
         self.init_config()
-        credentials = self.get_config('credentials.yaml')
-
-        self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-        self.mqtt_client.on_connect = self.mqtt_on_connect
-        self.mqtt_client.on_message = self.mqtt_on_message
+        self.state = OverwriteState(str(Path(__file__).parent / config.get('state_file', 'state/overwrites.journal')))
+        self.init_watchdog(config.get('input_timeouts') or {})
+        self.restore_overwrites()
+        self.mqtt_client = None
+        self.first_frame_sent = False
 
         try:
             self.can0 = can.interface.Bus(channel='can0', interface='socketcan')
@@ -31,17 +42,38 @@ class CanService:
 
         self.storage = CanStorage()
         self.storage.message_infos = self.config
-        self.can_byd_sim = CanBydSim(self.storage, self.can0, service_mode=True)
+        self.storage.analyzer.bitrate = config.get('bitrate', 500000)
+        self.storage.analyzer.expected_periods = config.get('expected_periods') or {}
+        self.stats_interval = config.get('stats_interval', 10.0)
+        self.stats_thread = threading.Thread(name='can-stats', target=self.publish_stats, daemon=True)
+        self.can_byd_sim = CanBydSim(self.storage, self.can0, service_mode=True, fast_start=True)
         self.can_byd_sim.events.on_start += self.can_start
         self.can_byd_sim.events.on_stop += self.can_stop
-        self.can_byd_sim.events.on_sent += self.message_processed
+        self.can_byd_sim.events.on_sent += self.message_sent
         self.can_byd_sim.events.on_received += self.message_processed
+        self.can_byd_sim.events.on_response += self.response_sent
 
-        self.mqtt_client.username_pw_set(credentials['username'], credentials['password'])
-        self.mqtt_client.will_set('master/can/available', 'offline', retain=True)
-        self.mqtt_client.connect(host=config['mqtt_server'], port=config['mqtt_port'])
+        if config.get('dashboard_port') is not None:
+            from can_dashboard import CanDashboard
+            try:
+                CanDashboard(self.storage, port=config['dashboard_port']).start()
+            except OSError as e:
+                print(f'dashboard disabled: {e}')
 
         self.can_byd_sim.thread.start_stop_thread()
+        self.watchdog.start()
+        self.stats_thread.start()
+
+        import paho.mqtt.client as mqtt
+
+        credentials = self.get_config('credentials.yaml', cache=False)
+        mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        mqtt_client.on_connect = self.mqtt_on_connect
+        mqtt_client.on_message = self.mqtt_on_message
+        mqtt_client.username_pw_set(credentials['username'], credentials['password'])
+        mqtt_client.will_set('master/can/available', 'offline', retain=True)
+        mqtt_client.connect_async(host=config['mqtt_server'], port=config['mqtt_port'])
+        self.mqtt_client = mqtt_client
 
     def init_config(self):
         for can_id in self.config:
@@ -50,15 +82,79 @@ class CanService:
                 if 'overwrite' in entry:
                     entry['default_overwrite'] = entry['overwrite']
 
+    def init_watchdog(self, input_timeouts: Dict):
+        self.input_timeouts = input_timeouts
+        self.overwrites_before_timeout = {}
+        self.overwrite_lock = threading.RLock()
+        self.watchdog = InputWatchdog(self.input_expired, self.input_recovered)
+        for input_topic in self.input_timeouts:
+            self.watchdog.add_input(input_topic, self.input_timeouts[input_topic]['timeout'])
+
+    def restore_overwrites(self):
+        for topic, value in self.state.load().items():
+            if not self.set_overwrite_by_topic(topic, value, persist=False):
+                self.state.delete(topic)
+
+    def get_overwrite_by_topic(self, topic: str):
+        for can_id in self.config:
+            for start_bit in self.config[can_id]:
+                entry: Dict = self.config[can_id][start_bit]
+                if 'topic' in entry and entry['topic'] == topic:
+                    return entry.get('overwrite')
+        return None
+
+    def keep_overwrite(self, topic: str):
+        with self.overwrite_lock:
+            self.overwrites_before_timeout.pop(topic, None)
+
+    def input_expired(self, input_topic: str):
+        print(f'input {input_topic} timed out')
+        with self.overwrite_lock:
+            for topic, value in self.input_timeouts[input_topic].get('safe_overwrites', {}).items():
+                if topic not in self.overwrites_before_timeout:
+                    self.overwrites_before_timeout[topic] = self.get_overwrite_by_topic(topic)
+                self.set_overwrite_by_topic(topic, value, persist=False)
+        if self.mqtt_client is not None:
+            self.mqtt_client.publish(f'master/can/input_timeout/{input_topic}', 'expired', retain=True)
+
+    def input_recovered(self, input_topic: str):
+        print(f'input {input_topic} recovered')
+        with self.overwrite_lock:
+            still_safe = set()
+            for other_topic, expired in self.watchdog.expired.items():
+                if expired:
+                    still_safe.update(self.input_timeouts[other_topic].get('safe_overwrites', {}))
+            for topic in self.input_timeouts[input_topic].get('safe_overwrites', {}):
+                if topic in still_safe or topic not in self.overwrites_before_timeout:
+                    continue
+                self.set_overwrite_by_topic(topic, self.overwrites_before_timeout.pop(topic), persist=False)
+        if self.mqtt_client is not None:
+            self.mqtt_client.publish(f'master/can/input_timeout/{input_topic}', 'ok', retain=True)
+
     @staticmethod
-    def get_config(filename: str) -> Dict:
-        with open(Path(__file__).parent / filename, 'r') as file:
-            try:
-                config = yaml.safe_load(file)
-                print(config)
-                return config
-            except yaml.YAMLError as e:
-                print(e)
+    def merge_dbc(config: Dict) -> Dict:
+        messages = config.get('messages') or {}
+        if 'dbc_file' not in config:
+            return messages
+        merged = dbc_to_message_infos(load_dbc(str(Path(__file__).parent / config['dbc_file'])), config.get('dbc_node'))
+        for can_id in messages:
+            merged.setdefault(can_id, {}).update(messages[can_id])
+        return merged
+
+    @staticmethod
+    def parse_yaml(content: bytes) -> Dict:
+        import yaml
+        try:
+            return yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+        except yaml.YAMLError as e:
+            print(e)
+
+    @staticmethod
+    def get_config(filename: str, cache: bool = True) -> Dict:
+        path = Path(__file__).parent / filename
+        if not cache:
+            return CanService.parse_yaml(path.read_bytes())
+        return load_cached(str(path), 'yaml', CanService.parse_yaml)
 
     def loop(self):
         self.mqtt_client.loop_forever(retry_first_connection=True)
@@ -67,12 +163,37 @@ class CanService:
         self.mqtt_client.loop_start()
 
     def can_start(self):
-        self.mqtt_client.publish('master/can', 'running')
+        if self.mqtt_client is not None:
+            self.mqtt_client.publish('master/can', 'running')
 
     def can_stop(self):
-        self.mqtt_client.publish('master/can', 'stopped')
+        if self.mqtt_client is not None:
+            self.mqtt_client.publish('master/can', 'stopped')
+
+    def message_sent(self, message: can.Message):
+        if not self.first_frame_sent:
+            self.first_frame_sent = True
+            print(f'first frame sent {time.perf_counter() - STARTUP_TIME:.3f} s after start', flush=True)
+        self.message_processed(message)
+
+    def response_sent(self, request: can.Message, latency: float):
+        if self.mqtt_client is not None:
+            self.mqtt_client.publish(f'master/can/response_latency/{request.arbitration_id:03x}',
+                                     f'{latency * 1000:.2f}')
+
+    def publish_stats(self):
+        while True:
+            time.sleep(self.stats_interval)
+            if self.mqtt_client is None:
+                continue
+            self.mqtt_client.publish('master/can/stats/bus_load', f'{self.storage.analyzer.bus_load():.2f}')
+            for can_id, stats in self.storage.analyzer.snapshot().items():
+                self.mqtt_client.publish(f'master/can/stats/{can_id:03x}', json.dumps(stats))
 
     def message_processed(self, message: can.Message):
+        self.storage.process_message(message)
+        if self.mqtt_client is None:
+            return
         for can_id in self.config:
             if can_id != message.arbitration_id:
                 continue
@@ -83,14 +204,21 @@ class CanService:
                 self.mqtt_client.publish(f"master/can/{entry['topic']}", f'{value:.2f}')
             break
 
-    def set_overwrite_by_topic(self, topic: str, value: float) -> bool:
-        for can_id in self.config:
-            for start_bit in self.config[can_id]:
-                entry: Dict = self.config[can_id][start_bit]
-                if 'topic' in entry and entry['topic'] == topic:
-                    self.config[can_id][start_bit]['overwrite'] = value
-                    return True
-        return False
+    def set_overwrite_by_topic(self, topic: str, value: Optional[float], persist: bool = True) -> bool:
+        with self.overwrite_lock:
+            for can_id in self.config:
+                for start_bit in self.config[can_id]:
+                    entry: Dict = self.config[can_id][start_bit]
+                    if 'topic' in entry and entry['topic'] == topic:
+                        if value is None:
+                            entry.pop('overwrite', None)
+                        else:
+                            entry['overwrite'] = value
+                        if persist:
+                            self.state.set(topic, value)
+                            self.keep_overwrite(topic)
+                        return True
+            return False
 
     def mqtt_on_connect(self, client, userdata, flags, reason_code, properties):
         self.mqtt_client.subscribe('master/can/start')
@@ -109,7 +237,7 @@ class CanService:
                                  retain=True)
         self.mqtt_client.publish('master/can/available', 'online', retain=True)
 
-    def mqtt_on_message(self, client: mqtt.Client, userdata: Any, msg: mqtt.MQTTMessage):
+    def mqtt_on_message(self, client: 'mqtt.Client', userdata: Any, msg: 'mqtt.MQTTMessage'):
         if msg.topic == 'master/can/start':
             self.can_byd_sim.thread.start_thread()
             return
@@ -118,16 +246,18 @@ class CanService:
             return
         elif msg.topic == 'master/relays/kill_switch':
             if msg.payload.decode() == 'pressed':
-                self.set_overwrite_by_topic('limits/max_voltage', 0.0)
-                self.set_overwrite_by_topic('limits/min_voltage', 0.0)
-                self.set_overwrite_by_topic('limits/max_discharge_current', 0.0)
-                self.set_overwrite_by_topic('limits/max_charge_current', 0.0)
+                with self.overwrite_lock:
+                    for topic in ('limits/max_voltage', 'limits/min_voltage', 'limits/max_discharge_current',
+                                  'limits/max_charge_current'):
+                        self.set_overwrite_by_topic(topic, 0.0, persist=False)
+                        self.keep_overwrite(topic)
             return
         elif msg.topic == self.total_system_voltage_topic:
             try:
                 system_voltage = float(msg.payload)
             except ValueError:
                 return
+            self.watchdog.feed(msg.topic)
             self.set_overwrite_by_topic('battery/voltage', system_voltage)
             return
         elif msg.topic == self.total_system_current_topic:
@@ -135,6 +265,7 @@ class CanService:
                 system_current = float(msg.payload) * -1
             except ValueError:
                 return
+            self.watchdog.feed(msg.topic)
             self.set_overwrite_by_topic('battery/current', system_current)
             return
         for can_id in self.config:
@@ -146,11 +277,17 @@ class CanService:
                             payload = float(msg.payload)
                         except ValueError:
                             break
-                        entry['overwrite'] = payload
+                        with self.overwrite_lock:
+                            entry['overwrite'] = payload
+                            self.state.set(entry['topic'], payload)
+                            self.keep_overwrite(entry['topic'])
                         break
                     elif f"master/can/{entry['topic']}/reset" == msg.topic:
-                        if 'default_overwrite' in entry:
-                            entry['overwrite'] = entry['default_overwrite']
+                        with self.overwrite_lock:
+                            if 'default_overwrite' in entry:
+                                entry['overwrite'] = entry['default_overwrite']
+                            self.state.delete(entry['topic'])
+                            self.keep_overwrite(entry['topic'])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,40 @@
+import time
+import unittest
+
+from can_thread import CanThread
+
+
+class CanThreadTest(unittest.TestCase):
+    def setUp(self):
+        self.runs = 0
+        self.thread = CanThread('test', self.worker)
+
+    def tearDown(self):
+        self.thread.stop_thread()
+        self.thread.wait_stopped(1.0)
+
+    def worker(self):
+        self.runs += 1
+        while self.thread.running:
+            time.sleep(0.001)
+        time.sleep(0.05)
+
+    def test_start_while_stopping_restarts(self):
+        self.thread.start_thread()
+        self.thread.stop_thread()
+        self.thread.start_thread()
+        self.assertTrue(self.thread.is_alive())
+        self.assertTrue(self.thread.running)
+        time.sleep(0.01)
+        self.assertEqual(self.runs, 2)
+
+    def test_toggle_twice_restarts(self):
+        self.thread.start_thread()
+        self.thread.start_stop_thread()
+        self.thread.start_stop_thread()
+        self.assertTrue(self.thread.running)
+        self.assertTrue(self.thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import errno
+import time
+import unittest
+from typing import List
+
+import can
+
+from can_transmit import CanTransmitQueue
+
+
+class FailingBus:
+    def __init__(self, errors: List[can.CanError]):
+        self.errors = errors
+        self.sent: List[can.Message] = []
+
+    def send(self, message: can.Message):
+        if len(self.errors) > 0:
+            raise self.errors.pop(0)
+        self.sent.append(message)
+
+
+class CanTransmitQueueTest(unittest.TestCase):
+    def flush_all(self, transmit: CanTransmitQueue):
+        delay = transmit.flush()
+        while delay is not None:
+            time.sleep(delay)
+            delay = transmit.flush()
+
+    def send_with_errors(self, errors: List[can.CanError]) -> FailingBus:
+        bus = FailingBus(errors)
+        transmit = CanTransmitQueue(bus, lambda message: None, max_backoff=0.001, max_retries=5)
+        transmit.put(can.Message(arbitration_id=0x110, data=b'\x00' * 8, is_extended_id=False))
+        self.flush_all(transmit)
+        return bus
+
+    def test_enobufs_is_retried(self):
+        bus = self.send_with_errors([can.CanError('No buffer space available', error_code=errno.ENOBUFS)] * 10)
+        self.assertEqual(len(bus.sent), 1)
+
+    def test_transmit_buffer_full_is_retried(self):
+        bus = self.send_with_errors([can.CanOperationError('Transmit buffer full')] * 10)
+        self.assertEqual(len(bus.sent), 1)
+        self.assertNotEqual(bus.sent[0].timestamp, 0.0)
+
+    def test_other_errors_are_dropped(self):
+        bus = self.send_with_errors([can.CanOperationError('Failed to transmit', error_code=errno.EIO)] * 10)
+        self.assertEqual(len(bus.sent), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from can_byd_sim import LIMITS_PERIOD, CanBydSim
+from can_state import OverwriteState
+from can_storage import CanStorage
+from service import CanService
+
+VOLTAGE_TOPIC = 'esp-total/total_voltage'
+TIMEOUT = 0.2
+REACTION = 0.05
+
+
+def limit_entry(topic: str) -> dict:
+    return {'endbit': 0, 'length': 2, 'overwrite': 25.0, 'scaling': 0.1, 'signed': True, 'topic': topic}
+
+
+class InputWatchdogTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        service = CanService.__new__(CanService)
+        service.config = {272: {4: limit_entry('limits/max_discharge_current'),
+                                6: limit_entry('limits/max_charge_current')}}
+        service.config[272][4]['endbit'] = 6
+        service.config[272][6]['endbit'] = 8
+        service.init_config()
+        service.total_system_voltage_topic = VOLTAGE_TOPIC
+        service.total_system_current_topic = 'esp-total/total_current'
+        service.mqtt_client = None
+        service.state = OverwriteState(str(Path(self.folder.name) / 'overwrites.journal'))
+        service.state.load()
+        service.init_watchdog({VOLTAGE_TOPIC: {'timeout': TIMEOUT, 'safe_overwrites': {
+            'limits/max_discharge_current': 0.0, 'limits/max_charge_current': 0.0}}})
+        self.service = service
+        storage = CanStorage()
+        storage.message_infos = service.config
+        self.sim = CanBydSim(storage, None, service_mode=True)
+
+    def tearDown(self):
+        self.service.state.close()
+        self.folder.cleanup()
+
+    def publish(self, topic: str, payload: bytes):
+        self.service.mqtt_on_message(None, None, SimpleNamespace(topic=topic, payload=payload))
+
+    def limits_frame(self) -> bytes:
+        return bytes(self.sim.calculate_message(0x110, b'\x09\x20\x06\x40\x01\x00\x01\x00').data)
+
+    def wait_for_limits(self, data: bytes, deadline: float) -> float:
+        while time.monotonic() < deadline + LIMITS_PERIOD:
+            if self.limits_frame()[4:] == data:
+                return time.monotonic()
+            time.sleep(0.001)
+        self.fail(f'limits frame did not change to {data.hex()}')
+
+    def test_expiry_applies_safe_overwrites_within_one_limits_period(self):
+        self.service.watchdog.start()
+        self.publish(VOLTAGE_TOPIC, b'270.0')
+        deadline = self.service.watchdog.deadlines[VOLTAGE_TOPIC]
+        self.assertEqual(self.limits_frame()[4:], b'\x00\xfa\x00\xfa')
+        applied = self.wait_for_limits(b'\x00' * 4, deadline)
+        self.assertLess(applied - deadline, REACTION)
+        sent = []
+        self.sim.transmit.can_bus = SimpleNamespace(send=sent.append)
+        self.sim.send_limits()
+        self.sim.transmit.flush()
+        self.assertEqual(sent[0].arbitration_id, 0x110)
+        self.assertEqual(bytes(sent[0].data[4:]), b'\x00' * 4)
+
+    def test_recovery_restores_previous_limits(self):
+        self.service.watchdog.start()
+        self.wait_for_limits(b'\x00' * 4, self.service.watchdog.deadlines[VOLTAGE_TOPIC])
+        fed = time.monotonic()
+        self.publish(VOLTAGE_TOPIC, b'270.0')
+        self.wait_for_limits(b'\x00\xfa\x00\xfa', fed)
+
+    def test_recovery_removes_safe_overwrite_without_previous_overwrite(self):
+        del self.service.config[272][6]['overwrite']
+        self.service.watchdog.start()
+        self.wait_for_limits(b'\x00' * 4, self.service.watchdog.deadlines[VOLTAGE_TOPIC])
+        fed = time.monotonic()
+        self.publish(VOLTAGE_TOPIC, b'270.0')
+        self.wait_for_limits(b'\x00\xfa\x01\x00', fed)
+        self.assertNotIn('overwrite', self.service.config[272][6])
+
+    def test_kill_switch_is_kept_after_recovery(self):
+        self.service.watchdog.start()
+        self.wait_for_limits(b'\x00' * 4, self.service.watchdog.deadlines[VOLTAGE_TOPIC])
+        self.publish('master/relays/kill_switch', b'pressed')
+        self.publish(VOLTAGE_TOPIC, b'270.0')
+        time.sleep(0.05)
+        self.assertFalse(self.service.watchdog.expired[VOLTAGE_TOPIC])
+        self.assertEqual(self.limits_frame()[4:], b'\x00' * 4)
+
+    def test_kill_switch_keeps_persisted_limits(self):
+        self.publish('master/can/limits/max_charge_current/set', b'5.0')
+        self.publish('master/relays/kill_switch', b'pressed')
+        self.assertEqual(self.limits_frame()[6:], b'\x00\x00')
+        self.service.state.close()
+        state = OverwriteState(str(self.service.state.path))
+        self.assertEqual(state.load()['limits/max_charge_current'], 5.0)
+        state.close()
+
+    def test_invalid_payload_does_not_feed(self):
+        deadline = self.service.watchdog.deadlines[VOLTAGE_TOPIC]
+        self.publish(VOLTAGE_TOPIC, b'garbage')
+        self.assertEqual(self.service.watchdog.deadlines[VOLTAGE_TOPIC], deadline)
+
+
+if __name__ == '__main__':
+    unittest.main()